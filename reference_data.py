@@ -0,0 +1,272 @@
+"""Static reference data for DigiLab Enterprise Tier 1.
+
+app.py is a Streamlit script and is re-executed top to bottom on every rerun;
+this module is imported once per process, so the read-only tables defined here
+are built and frozen once and shared by every session.
+"""
+import functools
+from types import MappingProxyType
+
+
+def freeze_reference_data(data):
+    """Recursively wrap static reference data as read-only mappings and tuples"""
+    if isinstance(data, dict):
+        return MappingProxyType({key: freeze_reference_data(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(freeze_reference_data(item) for item in data)
+    return data
+
+# =============================================================================
+# CLINICAL REFERENCE DATA
+# =============================================================================
+
+FDA_CLEARED_SYMPTOMS = freeze_reference_data({
+    "chest_pain": ["Coronary Artery Disease", "Pulmonary Embolism", "Pneumonia"],
+    "fever": ["Influenza", "COVID-19", "Pneumonia", "UTI"],
+    "shortness_of_breath": ["Asthma", "COPD", "Heart Failure", "Pulmonary Embolism"]
+})
+
+DRUG_INTERACTIONS = freeze_reference_data({
+    "Warfarin": ["Aspirin", "Ibuprofen", "Antibiotics"],
+    "Statins": ["Antifungals", "Macrolide Antibiotics"],
+    "ACE Inhibitors": ["Potassium Supplements", "NSAIDs"]
+})
+
+CLINICAL_GUIDELINES = freeze_reference_data({
+    "Diabetes": {"A1C_target": 7.0, "screening_tests": ["A1C", "Lipid Panel"]},
+    "Hypertension": {"BP_target": 130/80, "screening_tests": ["ECG", "Renal Function"]},
+    "COVID-19": {"testing_criteria": ["fever", "cough", "exposure"], "isolation_period": 5}
+})
+
+CONNECTED_INSTRUMENTS = freeze_reference_data({
+    'Abbott_Architect': True,
+    'Roche_Cobas': True,
+    'Siemens_Advia': True
+})
+
+# =============================================================================
+# CODING & PRICING REFERENCE DATA
+# =============================================================================
+
+CPT_CODES = freeze_reference_data({
+    "Office Visit": ["99213", "99214", "99215"],
+    "Lab Tests": ["80053", "85025", "81000"],
+    "Imaging": ["72148", "74150", "71250"]
+})
+
+ICD10_CODES = freeze_reference_data({
+    "Diabetes": ["E11.9", "E11.65", "E11.8"],
+    "Hypertension": ["I10", "I11.9", "I12.9"],
+    "COVID-19": ["U07.1", "J12.82"],
+    "Malaria": ["B54", "B50.9", "B51.9"],
+    "HIV/AIDS": ["B20", "Z21", "R75"]
+})
+
+PRIOR_AUTH_RULES = freeze_reference_data({
+    "MRI": ["failed conservative treatment", "neurological symptoms"],
+    "Specialty Medications": ["failed first-line treatment", "specific lab values"],
+    "Surgery": ["failed non-surgical treatment", "imaging confirmation"]
+})
+
+KENYAN_PRICING = freeze_reference_data({
+    "Consultation": {
+        "General Practitioner": 1500,
+        "Specialist": 3000,
+        "Consultant": 5000
+    },
+    "Laboratory Tests": {
+        "Complete Blood Count (CBC)": 800,
+        "Basic Metabolic Panel": 1200,
+        "Liver Function Tests": 1500,
+        "Malaria Test": 500,
+        "HIV Test": 300,
+        "COVID-19 PCR": 2500,
+        "Urinalysis": 400,
+        "Lipid Panel": 1800
+    },
+    "Imaging": {
+        "X-Ray": 2500,
+        "Ultrasound": 4500,
+        "CT Scan": 12000,
+        "MRI": 25000
+    },
+    "Procedures": {
+        "Minor Surgery": 15000,
+        "Major Surgery": 80000,
+        "Endoscopy": 35000,
+        "Colonoscopy": 45000
+    },
+    "Room Charges": {
+        "General Ward per day": 2000,
+        "Private Ward per day": 8000,
+        "ICU per day": 25000
+    }
+})
+
+# =============================================================================
+# DEMO DATA POOLS
+# =============================================================================
+
+# Value pools for the demo EHR, ward and rounds generators in app.py
+EHR_FIRST_NAMES = ("John", "Jane", "Robert", "Maria", "David", "Sarah", "Michael", "Lisa")
+EHR_LAST_NAMES = ("Ochieng'", "Ayacko", "Waweru", "Akinyi", "Ojijo", "Hassan", "Wakaya", "Raburu")
+GENDERS = ("Male", "Female")
+BLOOD_TYPES = ("A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-")
+EHR_INSURANCE_PLANS = ("Blue Cross PPO", "Medicare", "Aetna HMO", "United Healthcare")
+EHR_ALLERGIES = ("Penicillin", "None known", "Sulfa drugs", "Peanuts")
+EHR_MEDICATIONS = ("Lisinopril 10mg daily, Metformin 500mg twice daily", 
+                   "Atorvastatin 20mg daily", "None", "Levothyroxine 50mcg daily")
+EHR_PAST_CONDITIONS = ("Hypertension, Type 2 Diabetes", "Asthma", "Hyperlipidemia", "None significant")
+EHR_FAMILY_HISTORY = ("Cardiac disease in father", "Diabetes in mother", "Cancer in siblings", "No significant family history")
+EHR_SYMPTOMS = ("Fever, cough, shortness of breath", "Headache, fatigue, body aches", 
+                "Chest pain, palpitations", "Abdominal pain, nausea")
+
+WARD_FIRST_NAMES = ("James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda")
+WARD_LAST_NAMES = ("Ouma", "Wanjiku", "Okinda", "Akello", "Okuno", "Achia", "Kombe", "Anyango")
+WARD_CONDITIONS = ("Pneumonia", "COVID-19", "Hypertensive Crisis", "Diabetes Management", 
+                   "Cardiac Arrhythmia", "Sepsis", "Stroke", "COPD Exacerbation")
+WARD_DOCTORS = ("Dr. Kevin", "Dr. Otiende", "Dr. Lavendar", "Dr. Aloo", "Dr. Danis")
+WARD_INSURANCE = ("Medicare", "Blue Cross", "Aetna", "Self-pay")
+WARD_STATUSES = ("Active", "Active", "Active", "Discharged", "High Risk")
+ROUNDS_CONDITIONS = ("Pneumonia", "CHF", "COPD", "Sepsis", "UTI")
+
+# Patient IDs shared by the demo patient and ward-rounds generators
+DEMO_PATIENT_IDS = tuple(f"PAT-{1000 + i}" for i in range(64))
+
+# =============================================================================
+# LAB TEST CATALOGUE
+# =============================================================================
+
+TEST_CATEGORIES = freeze_reference_data({
+    "Hematology": ["Complete Blood Count (CBC)", "Hemoglobin", "Hematocrit", "Platelet Count"],
+    "Chemistry": ["Basic Metabolic Panel", "Comprehensive Metabolic Panel", "Liver Function Tests", "Lipid Panel"],
+    "Infectious Disease": ["COVID-19 PCR", "Influenza Test", "HIV Test", "Malaria Test"],
+    "Urinalysis": ["Urinalysis", "Urine Culture", "Microalbumin"],
+    "Coagulation": ["PT/INR", "PTT", "Fibrinogen"],
+    "Tumor Markers": ["PSA", "CEA", "CA-125"],
+    "Hormones": ["TSH", "Free T4", "Cortisol"]
+})
+TEST_CATEGORY_NAMES = tuple(TEST_CATEGORIES)
+
+NORMAL_RANGES = freeze_reference_data({
+    "Complete Blood Count (CBC)": "Varies by component",
+    "Hemoglobin": "12.0-16.0 g/dL (F), 13.5-17.5 g/dL (M)",
+    "Hematocrit": "36%-48% (F), 41%-50% (M)",
+    "Platelet Count": "150,000-450,000/μL",
+    "Basic Metabolic Panel": "Varies by component",
+    "Sodium": "135-145 mmol/L",
+    "Potassium": "3.5-5.0 mmol/L",
+    "Chloride": "98-106 mmol/L",
+    "CO2": "23-29 mmol/L",
+    "Glucose": "70-100 mg/dL (fasting)",
+    "Creatinine": "0.6-1.2 mg/dL (F), 0.7-1.3 mg/dL (M)",
+    "Liver Function Tests": "Varies by component",
+    "ALT": "7-56 U/L",
+    "AST": "10-40 U/L",
+    "ALP": "44-147 U/L",
+    "Total Bilirubin": "0.1-1.2 mg/dL",
+    "Lipid Panel": "Varies by component",
+    "Total Cholesterol": "<200 mg/dL",
+    "LDL": "<100 mg/dL",
+    "HDL": ">40 mg/dL (M), >50 mg/dL (F)",
+    "Triglycerides": "<150 mg/dL",
+    "COVID-19 PCR": "Negative",
+    "Influenza Test": "Negative",
+    "HIV Test": "Negative",
+    "TSH": "0.4-4.0 mIU/L"
+})
+
+# =============================================================================
+# NAVIGATION
+# =============================================================================
+
+# Sidebar pages per role; any other role gets the admin list
+NAV_BY_ROLE = MappingProxyType({
+    'doctor': (
+        "🏠 Enhanced Dashboard", "📝 Smart Patient Registration", 
+        "👨‍⚕️ Enhanced Clinical Review", "👥 Patient Management",
+        "📊 Predictive Analytics"
+    ),
+    'lab_technician': (
+        "🏠 Enhanced Dashboard", "🔬 Lab Technician Dashboard"
+    ),
+    'pharmacist': (
+        "🏠 Enhanced Dashboard", "💊 Pharmacist Dashboard"
+    ),
+    'admin': (
+        "🏠 Enhanced Dashboard", "📝 Smart Patient Registration", 
+        "👥 Patient Management", "🧪 Advanced Lab Portal",
+        "👨‍⚕️ Enhanced Clinical Review", "💊 Pharmacist Dashboard",
+        "📊 Predictive Analytics", "⚙️ System Administration", 
+        "💰 Revenue Cycle", "🛡️ Security Dashboard"
+    )
+})
+
+# =============================================================================
+# ANALYTICS DEMO DATA
+# =============================================================================
+
+RISK_LEVEL_COLORS = freeze_reference_data({'Low': 'green', 'Medium': 'orange', 'High': 'red'})
+
+HIGH_RISK_PATIENTS = freeze_reference_data([
+    {"Name": "John Kamau", "Age": 68, "Condition": "Heart Failure", "Risk Score": "87%", "Days Since Discharge": 5},
+    {"Name": "Mary Wanjiku", "Age": 72, "Condition": "COPD", "Risk Score": "79%", "Days Since Discharge": 3},
+    {"Name": "Robert Ochieng", "Age": 55, "Condition": "Diabetes + Renal", "Risk Score": "92%", "Days Since Discharge": 7},
+    {"Name": "Sarah Akinyi", "Age": 61, "Condition": "Stroke", "Risk Score": "84%", "Days Since Discharge": 2}
+])
+
+SEPSIS_MONITORING_DATA = freeze_reference_data({
+    'Patient': ['P-1001', 'P-1002', 'P-1003', 'P-1004', 'P-1005'],
+    'Sepsis Risk': [15, 62, 8, 87, 23],
+    'Temperature': [37.8, 38.5, 36.9, 39.2, 37.2],
+    'Heart Rate': [88, 112, 76, 124, 82],
+    'WBC Count': [8.2, 15.8, 6.5, 18.2, 7.8]
+})
+
+# =============================================================================
+# LAB RESULT LOOKUPS
+# =============================================================================
+# Memoized here rather than in app.py, where each rerun would start a fresh, empty cache
+
+# (keyword, sample type) checked in order; tests matching none are drawn as blood
+SAMPLE_TYPE_KEYWORDS = (
+    ("Urine", "Urine"),
+    ("Urinalysis", "Urine"),
+    ("Stool", "Stool"),
+    ("Sputum", "Sputum"),
+    ("Swab", "Swab")
+)
+
+@functools.lru_cache(maxsize=256)
+def get_sample_type(test_name):
+    """Sample type to collect for a test (memoized per test name)"""
+    return next((sample for keyword, sample in SAMPLE_TYPE_KEYWORDS if keyword in test_name), "Blood")
+
+# Critical (low, high) limits; a missing side is open-ended
+CRITICAL_RANGES = MappingProxyType({
+    "Potassium": (2.5, 6.0),
+    "Sodium": (120, 160),
+    "Glucose": (50, 500),
+    "Calcium": (6.0, 13.0),
+    "Creatinine": (float("-inf"), 10.0)
+})
+
+@functools.lru_cache(maxsize=512)
+def get_critical_limits(test_name):
+    """Critical limits for every analyte named in test_name (memoized per name)"""
+    return tuple(limits for test, limits in CRITICAL_RANGES.items() if test in test_name)
+
+@functools.lru_cache(maxsize=512)
+def parse_normal_range(normal_range):
+    """Parse a "low-high unit" range string into (low, high), or None (memoized per string)"""
+    # Simple parsing of normal range strings
+    if "-" in normal_range:
+        try:
+            low, high = normal_range.split("-")
+            low = float(low.split()[0])  # Take first number before space
+            high = float(high.split()[0])
+            return low, high
+        except (ValueError, IndexError):
+            return None
+    
+    return None